@@ -117,9 +117,17 @@ def script_main(script):
 # If this script is run from SecureCRT directly, use the SecureCRT specific class
 if __name__ == "builtins":
     crt_script = scripts.CRTScript(crt)
-    script_main(crt_script)
+    try:
+        script_main(crt_script)
+    finally:
+        # Write out and close the debug log, even if the script failed.
+        crt_script.close_logs()
 
 # If the script is being run directly, use the simulation class
 elif __name__ == "__main__":
     direct_script = scripts.DebugScript(os.path.realpath(__file__))
-    script_main(direct_script)
\ No newline at end of file
+    try:
+        script_main(direct_script)
+    finally:
+        # Write out and close the debug log, even if the script failed.
+        direct_script.close_logs()
\ No newline at end of file
@@ -77,15 +77,12 @@ def script_main(script):
         output_file.write("MAC ADDRESS SEARCH IN VLANS: {0}\n\n".format(num_string))
         # ########################################  START DEVICE CONNECT LOOP  ###########################################
         for device in device_list:
-            hostname = device['Hostname']
-            protocol = device['Protocol']
-            username = device['Username']
-            password = device['Password']
-            enable = device['Enable']
-            try:
-                proxy = device['Proxy Session']
-            except KeyError:
-                proxy = None
+            hostname = device.hostname
+            protocol = device.protocol
+            username = device.username
+            password = device.password
+            enable = device.enable
+            proxy = device.proxy
 
             if not proxy and use_proxy:
                 proxy = default_proxy_session
@@ -210,15 +207,19 @@ if __name__ == "builtins":
     # Initialize script object
     crt_script = scripts.CRTScript(crt)
     # Run script's main logic against the script object
-    script_main(crt_script)
-    # Shutdown logging after
-    logging.shutdown()
+    try:
+        script_main(crt_script)
+    finally:
+        # Write out and close the debug log, even if the script failed.
+        crt_script.close_logs()
 
 # If the script is being run directly, use the simulation class
 elif __name__ == "__main__":
     # Initialize script object
     direct_script = scripts.DebugScript(os.path.realpath(__file__))
     # Run script's main logic against the script object
-    script_main(direct_script)
-    # Shutdown logging after
-    logging.shutdown()
\ No newline at end of file
+    try:
+        script_main(direct_script)
+    finally:
+        # Write out and close the debug log, even if the script failed.
+        direct_script.close_logs()
\ No newline at end of file
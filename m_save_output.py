@@ -4,6 +4,7 @@
 import os
 import sys
 import logging
+from collections import namedtuple
 
 # Add script directory to the PYTHONPATH so we can import our modules (only if run from SecureCRT)
 if 'crt' in globals():
@@ -25,6 +26,18 @@ logger = logging.getLogger("securecrt")
 logger.debug("Starting execution of {0}".format(script_name))
 
 
+# The settings for a run of this script, which are the same for every device in the list.
+RunConfig = namedtuple("RunConfig", "send_cmd use_proxy default_proxy_session failed_log")
+
+# Labels used in the failure log for the errors we expect while working on a device.  Anything else is logged as an
+# "Exception" along with its type.
+FAILURE_LABELS = {
+    scripts.ConnectError: "Connect failure",
+    sessions.InteractionError: "Failure",
+    sessions.UnsupportedOSError: "Unsupported OS",
+}
+
+
 # ################################################   SCRIPT LOGIC   ##################################################
 
 def script_main(script):
@@ -60,53 +73,79 @@ def script_main(script):
     if send_cmd == "":
         return
 
-    # Check settings if we should use a proxy/jumpbox
-    use_proxy = script.settings.getboolean("Global", "use_proxy")
-    default_proxy_session = script.settings.get("Global", "proxy_session")
-
-    # Create a filename to keep track of our connection logs, if we have failures.  Use script name without extension
-    failed_log = session.create_output_filename("{0}-LOG".format(script_name.split(".")[0]), include_hostname=False)
+    # Check settings if we should use a proxy/jumpbox, and create a filename to keep track of our connection logs, if we
+    # have failures (use script name without extension).  These are read once and shared by every device.
+    run_config = RunConfig(
+        send_cmd=send_cmd,
+        use_proxy=script.settings.getboolean("Global", "use_proxy"),
+        default_proxy_session=script.settings.get("Global", "proxy_session"),
+        failed_log=session.create_output_filename("{0}-LOG".format(os.path.splitext(script_name)[0]),
+                                                  include_hostname=False),
+    )
 
     # ########################################  START DEVICE CONNECT LOOP  ###########################################
 
-    for device in device_list:
-        hostname = device['Hostname']
-        protocol = device['Protocol']
-        username = device['Username']
-        password = device['Password']
-        enable = device['Enable']
-        try:
-            proxy = device['Proxy Session']
-        except KeyError:
-            proxy = None
+    # SecureCRT only allows a script to drive one tab at a time (the crt object is not thread-safe), so devices are
+    # processed one after another.  The per-device logic lives in _handle_device() so it stays independent of the loop.
+    # The failure log is opened on the first failure and kept open for the rest of the loop, instead of being opened and
+    # closed for every failed device.  It is not created at all if every device succeeds.
+    failed_fp = None
+    try:
+        for device in device_list:
+            failure = _handle_device(script, device, run_config)
+            if failure:
+                if not failed_fp:
+                    failed_fp = open(run_config.failed_log, 'a', buffering=64 * 1024)
+                failed_fp.write(failure)
+    finally:
+        if failed_fp:
+            failed_fp.close()
+
+    # #########################################  END DEVICE CONNECT LOOP  ############################################
 
-        if not proxy and use_proxy:
-            proxy = default_proxy_session
 
-        logger.debug("<M_SCRIPT> Connecting to {0}.".format(hostname))
+def _handle_device(script, device, run_config):
+    """
+    Connects to a single device from the device list, runs per_device_work() against it and then disconnects.  Any
+    failure is caught and returned as a line for the failure log, so that one bad device does not stop the loop.
+
+    :param script: The script object that is used to connect to the device
+    :type script: scripts.Script
+    :param device: A device entry from the list returned by import_device_list()
+    :type device: scripts.Device
+    :param run_config: The settings for this run (command to capture, proxy settings, etc)
+    :type run_config: RunConfig
+
+    :return: The failure log line for the device, or None if the device was successful
+    :rtype: str
+    """
+    hostname = device.hostname
+    protocol = device.protocol
+    username = device.username
+    password = device.password
+    enable = device.enable
+    # SecureCRT opens the proxy/jumpbox session itself (the "Firewall" option), so only the session name is needed here.
+    proxy = device.proxy
+    if not proxy and run_config.use_proxy:
+        proxy = run_config.default_proxy_session
+
+    session = script.get_main_session()
+    logger.debug(f"<M_SCRIPT> Connecting to {hostname}.")
+    try:
+        script.connect(hostname, username, password, protocol=protocol, proxy=proxy)
+        session = script.get_main_session()
+        per_device_work(session, enable, run_config.send_cmd)
+        script.disconnect()
+    except Exception as e:
+        label = FAILURE_LABELS.get(type(e)) or f"Exception ({type(e).__name__})"
+        # Don't let a failed disconnect hide the original error
         try:
-            script.connect(hostname, username, password, protocol=protocol, proxy=proxy)
-            session = script.get_main_session()
-            per_device_work(session, enable, send_cmd)
-            script.disconnect()
-        except scripts.ConnectError as e:
-            with open(failed_log, 'a') as logfile:
-                logfile.write("<M_SCRIPT> Connect to {0} failed: {1}\n".format(hostname, e.message.strip()))
-                session.disconnect()
-        except sessions.InteractionError as e:
-            with open(failed_log, 'a') as logfile:
-                logfile.write("<M_SCRIPT> Failure on {0}: {1}\n".format(hostname, e.message.strip()))
-                session.disconnect()
-        except sessions.UnsupportedOSError as e:
-            with open(failed_log, 'a') as logfile:
-                logfile.write("<M_SCRIPT> Unsupported OS on {0}: {1}\n".format(hostname, e.message.strip()))
-                session.disconnect()
-        except Exception as e:
-            with open(failed_log, 'a') as logfile:
-                logfile.write("<M_SCRIPT> Exception on {0}: {1} ({2})\n".format(hostname, e.message.strip(), e))
-                session.disconnect()
+            session.disconnect()
+        except Exception:
+            pass
+        return f"<M_SCRIPT> {label} on {hostname}: {str(e).strip()}\n"
 
-    # #########################################  END DEVICE CONNECT LOOP  ############################################
+    return None
 
 
 def per_device_work(session, enable_pass, send_cmd):
@@ -137,15 +176,19 @@ if __name__ == "builtins":
     # Initialize script object
     crt_script = scripts.CRTScript(crt)
     # Run script's main logic against the script object
-    script_main(crt_script)
-    # Shutdown logging after
-    logging.shutdown()
+    try:
+        script_main(crt_script)
+    finally:
+        # Write out and close the debug log, even if the script failed.
+        crt_script.close_logs()
 
 # If the script is being run directly, use the simulation class
 elif __name__ == "__main__":
     # Initialize script object
     direct_script = scripts.DebugScript(os.path.realpath(__file__))
     # Run script's main logic against the script object
-    script_main(direct_script)
-    # Shutdown logging after
-    logging.shutdown()
\ No newline at end of file
+    try:
+        script_main(direct_script)
+    finally:
+        # Write out and close the debug log, even if the script failed.
+        direct_script.close_logs()
\ No newline at end of file
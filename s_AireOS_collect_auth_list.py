@@ -92,8 +92,9 @@ if __name__ == "builtins":
     except Exception:
         crt_session.end_cisco_session()
         raise
-    # Shutdown logging after
-    logging.shutdown()
+    finally:
+        # Write out and close the debug log, even if the script failed.
+        crt_script.close_logs()
 
 # If the script is being run directly, use the simulation class
 elif __name__ == "__main__":
@@ -102,6 +103,8 @@ elif __name__ == "__main__":
     # Get a simulated session object to pass into the script.
     sim_session = direct_script.get_main_session()
     # Run script's main logic against our session
-    script_main(sim_session)
-    # Shutdown logging after
-    logging.shutdown()
+    try:
+        script_main(sim_session)
+    finally:
+        # Write out and close the debug log, even if the script failed.
+        direct_script.close_logs()
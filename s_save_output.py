@@ -44,15 +44,16 @@ def script_main(session):
     # Get script object that owns this session, so we can check settings, get textfsm templates, etc
     script = session.script
 
-    # Start session with device, i.e. modify term parameters for better interaction (assuming already connected)
-    session.start_cisco_session()
-
+    # Ask for the command first, so nothing is sent to the device if the user cancels.
     send_cmd = script.prompt_window("Enter the command to capture")
     logger.debug("Received command: '{0}'".format(send_cmd))
 
     if send_cmd == "":
         return
 
+    # Start session with device, i.e. modify term parameters for better interaction (assuming already connected)
+    session.start_cisco_session()
+
     # Generate filename used for output files.
     full_file_name = session.create_output_filename(send_cmd)
 
@@ -77,8 +78,9 @@ if __name__ == "builtins":
     except Exception:
         crt_session.end_cisco_session()
         raise
-    # Shutdown logging after
-    logging.shutdown()
+    finally:
+        # Write out and close the debug log, even if the script failed.
+        crt_script.close_logs()
 
 # If the script is being run directly, use the simulation class
 elif __name__ == "__main__":
@@ -87,6 +89,8 @@ elif __name__ == "__main__":
     # Get a simulated session object to pass into the script.
     sim_session = direct_script.get_main_session()
     # Run script's main logic against our session
-    script_main(sim_session)
-    # Shutdown logging after
-    logging.shutdown()
+    try:
+        script_main(sim_session)
+    finally:
+        # Write out and close the debug log, even if the script failed.
+        direct_script.close_logs()
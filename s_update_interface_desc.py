@@ -62,12 +62,7 @@ def script_main(session, prompt_check_mode=True, check_mode=True, enable_pass=No
     # Get script object that owns this session, so we can check settings, get textfsm templates, etc
     script = session.script
 
-    # Start session with device, i.e. modify term parameters for better interaction (assuming already connected)
-    session.start_cisco_session(enable_pass=enable_pass)
-
-    # Validate device is running a supported OS
-    session.validate_os(["IOS", "NXOS"])
-
+    # Ask about check mode first, so nothing is sent to the device if the user cancels.
     if prompt_check_mode:
         # Ask if this should be a test run (generate configs only) or full run (push updates to devices)
         check_mode_message = "Do you want to run this script in check mode? (Only generate configs)\n" \
@@ -82,33 +77,29 @@ def script_main(session, prompt_check_mode=True, check_mode=True, enable_pass=No
         elif result == IDNO:
             check_mode = False
         else:
-            session.end_cisco_session()
             return
 
+    # Start session with device, i.e. modify term parameters for better interaction (assuming already connected)
+    session.start_cisco_session(enable_pass=enable_pass)
+
+    # Validate device is running a supported OS
+    session.validate_os(["IOS", "NXOS"])
+
     # Get setting if we want to save before/after backups
     take_backups = script.settings.getboolean("update_interface_desc", "take_backups")
 
     if not check_mode and take_backups:
-        # Save "show run" to file, plus read it back in for processing.
+        # Save "show run" to file, then parse it back from that file.  get_command_output() also goes through a
+        # (temporary) file, so writing the backup file directly and reading it back avoids a second capture to disk.
         before_filename = session.create_output_filename("1-show-run-BEFORE")
         session.write_output_to_file("show run", before_filename)
-        # Read in contents of file for processing
+        # Extract interface/description pairs line by line, instead of loading the whole config into memory first
         with open(before_filename, 'r') as show_run:
-            show_run_before = show_run.read()
+            ex_desc_lookup = utilities.extract_desc_pairs(show_run)
     else:
         # Just read in "show run" contents for processing
         show_run_before = session.get_command_output("show run")
-
-    # Use TextFSM to extract interface/description pairs from the show run output
-    desc_template = session.script.get_template("cisco_os_show_run_desc.template")
-    desc_list = utilities.textfsm_parse_to_list(show_run_before, desc_template)
-
-    # Turn the TextFSM list into a dictionary we can use to lookup by interface
-    ex_desc_lookup = {}
-    # Change interface names to long versions for better matching with other outputs
-    for entry in desc_list:
-        intf = utilities.long_int_name(entry[0])
-        ex_desc_lookup[intf] = entry[1]
+        ex_desc_lookup = utilities.extract_desc_pairs(show_run_before)
 
     # Get CDP Data
     raw_cdp = session.get_command_output("show cdp neighbors detail")
@@ -145,88 +136,71 @@ def script_main(session, prompt_check_mode=True, check_mode=True, enable_pass=No
     # Create a list to append configuration commands and rollback commands
     config_commands = []
     rollback = []
+    config_commands_extend = config_commands.extend
+    rollback_extend = rollback.extend
+
+    def _emit(interface, new_desc, existing_desc):
+        # Only update description if we will be making a change
+        if new_desc != existing_desc:
+            config_commands_extend((f"interface {interface}", f" description {new_desc}"))
+            rollback_extend((f"interface {interface}",
+                             f" description {existing_desc}" if existing_desc else " no description"))
 
     # Get an alphabetically sorted list of interfaces
-    intf_list = sorted(list(description_data.keys()), key=utilities.human_sort_key)
+    intf_list = sorted(description_data, key=utilities.human_sort_key)
 
     # Generate a list of configuration commands (and rollback if necessary)
     for interface in intf_list:
         # Get existing description
-        try:
-            existing_desc = ex_desc_lookup[interface]
-        except KeyError:
-            existing_desc = ""
-
-        # If a port-channel only use hostname in description
-        if "port-channel" in interface.lower():
-            neigh_list = description_data[interface]
+        existing_desc = ex_desc_lookup.get(interface, "")
+
+        # If a port-channel only use hostname in description.  add_port_channels() stores port-channels as a list of
+        # neighbor names, while physical interfaces from extract_cdp_data() are a (host, interface) tuple.
+        neighbor_data = description_data[interface]
+        if isinstance(neighbor_data, list):
             # If there is only 1 neighbor, use that
-            if len(neigh_list) == 1:
-                new_desc = neigh_list[0]
+            if len(neighbor_data) == 1:
+                _emit(interface, neighbor_data[0], existing_desc)
             # If there are 2 neighbors, assume a vPC and label appropriately
-            if len(neigh_list) == 2:
-                neigh_list = sorted(neigh_list, key=utilities.human_sort_key)
-                new_desc = "vPC: {0}, {1}".format(neigh_list[0], neigh_list[1])
-            # Only update description if we will be making a change
-            if new_desc != existing_desc:
-                config_commands.append("interface {0}".format(interface))
-                config_commands.append(" description {0}".format(new_desc))
-                rollback.append("interface {0}".format(interface))
-                if not existing_desc:
-                    rollback.append(" no description")
-                else:
-                    rollback.append(" description {0}".format(existing_desc))
+            elif len(neighbor_data) == 2:
+                neigh_list = sorted(neighbor_data, key=utilities.human_sort_key)
+                _emit(interface, f"vPC: {neigh_list[0]}, {neigh_list[1]}", existing_desc)
 
         # For other interfaces, use remote hostname and interface
         else:
-            remote_host = description_data[interface][0]
-            remote_intf = utilities.short_int_name(description_data[interface][1])
-            new_desc = "{0} {1}".format(remote_host, remote_intf)
-            # Only update description if we will be making a change
-            if new_desc != existing_desc:
-                config_commands.append("interface {0}".format(interface))
-                config_commands.append(" description {0}".format(new_desc))
-                rollback.append("interface {0}".format(interface))
-                if not existing_desc:
-                    rollback.append(" no description")
-                else:
-                    rollback.append(" description {0}".format(existing_desc))
+            remote_host = neighbor_data[0]
+            remote_intf = utilities.short_int_name(neighbor_data[1])
+            _emit(interface, f"{remote_host} {remote_intf}", existing_desc)
 
     # If in check-mode, generate configuration and write it to a file, otherwise push the config to the device.
     if config_commands:
+        # Pick the file descriptions for this run.  When pushing changes with backups, the files are numbered in the
+        # order they are created (the 1-show-run-BEFORE file was saved above).
         if check_mode:
-            output_filename = session.create_output_filename("intf-desc")
-            with open(output_filename, 'wb') as output_file:
-                for command in config_commands:
-                    output_file.write("{0}\n".format(command))
-            rollback_filename = session.create_output_filename("intf-rollback")
+            config_desc, rollback_desc = "intf-desc", "intf-rollback"
+        elif take_backups:
+            config_desc, rollback_desc = "2-CONFIG-RESULTS", "4-ROLLBACK"
         else:
-            # Check settings to see if we prefer to save backups before/after applying changes
+            config_desc, rollback_desc = "CONFIG-RESULTS", "ROLLBACK"
+        output_filename = session.create_output_filename(config_desc)
+
+        if check_mode:
+            utilities.write_commands_to_file(config_commands, output_filename)
+        else:
+            # Push configuration, capturing the configure terminal log
+            session.send_config_commands(config_commands, output_filename)
+            # Back up configuration after changes are applied, if we prefer to save backups before/after changes
             if take_backups:
-                # Push configuration, capturing the configure terminal log
-                output_filename = session.create_output_filename("2-CONFIG-RESULTS")
-                session.send_config_commands(config_commands, output_filename)
-                # Back up configuration after changes are applied
                 after_filename = session.create_output_filename("3-show-run-AFTER")
                 session.write_output_to_file("show run", after_filename)
-                # Set Rollback filename, in case this option is used
-                rollback_filename = session.create_output_filename("4-ROLLBACK")
-            else:
-                # Push configuration, capturing the configure terminal log
-                output_filename = session.create_output_filename("CONFIG-RESULTS")
-                session.send_config_commands(config_commands, output_filename)
-                # Set Rollback filename, in case this option is used
-                rollback_filename = session.create_output_filename("ROLLBACK")
-
             # Save configuration
             session.save()
 
         # Check our settings to see if we should create a rollback.
         create_rollback = script.settings.getboolean("update_interface_desc", "rollback_file")
         if create_rollback:
-            with open(rollback_filename, 'wb') as output_file:
-                for command in rollback:
-                    output_file.write("{0}\n".format(command))
+            rollback_filename = session.create_output_filename(rollback_desc)
+            utilities.write_commands_to_file(rollback, rollback_filename)
 
     # Return terminal parameters back to the original state.
     session.end_cisco_session()
@@ -256,8 +230,8 @@ def extract_cdp_data(cdp_table):
 
         # 7Ks can give multiple CDP entries when VDCs share the mgmt0 port.  If duplicate name is found, remove it
         if local_intf in found_intfs:
-            # Remove from our description list
-            cdp_data.pop(system_name, None)
+            # Remove from our description list.  found_intfs is still needed so a 3rd entry isn't added back.
+            cdp_data.pop(local_intf, None)
         else:
             cdp_data[local_intf] = (system_name, remote_intf)
             found_intfs.add(local_intf)
@@ -271,22 +245,19 @@ def add_port_channels(desc_data, pc_data):
     have members found in the CDP table.
 
     :param desc_data: Our CDP description data that needs to be updated
-    :type desc_data:
-    :param pc_data:
-    :type: pc_data:
+    :type desc_data: dict
+    :param pc_data: The TextFSM output for the port-channel summary (without a header row)
+    :type pc_data: list of list
     """
-    for entry in pc_data:
-        po_name = utilities.long_int_name(entry[0])
-        intf_list = entry[4]
-        neighbor_set = set()
+    # Look up the neighbor name for each physical interface from CDP once, before any port-channels are added.
+    member_hosts = {intf: neighbor[0] for intf, neighbor in desc_data.items()}
 
-        # For each index in the intf_list
-        for intf in intf_list:
-            long_name = utilities.long_int_name(intf)
-            if long_name in desc_data:
-                neighbor_set.add(desc_data[long_name][0])
-        if len(neighbor_set) > 0:
-            desc_data[po_name] = list(neighbor_set)
+    for entry in pc_data:
+        # entry[4] is the list of member interfaces of the port-channel in entry[0]
+        member_names = (utilities.long_int_name(intf) for intf in entry[4])
+        neighbor_set = {member_hosts[name] for name in member_names if name in member_hosts}
+        if neighbor_set:
+            desc_data[utilities.long_int_name(entry[0])] = list(neighbor_set)
 
 
 # ################################################  SCRIPT LAUNCH   ###################################################
@@ -303,8 +274,9 @@ if __name__ == "builtins":
     except Exception:
         crt_session.end_cisco_session()
         raise
-    # Shutdown logging after
-    logging.shutdown()
+    finally:
+        # Write out and close the debug log, even if the script failed.
+        crt_script.close_logs()
 
 # If the script is being run directly, use the simulation class
 elif __name__ == "__main__":
@@ -313,6 +285,8 @@ elif __name__ == "__main__":
     # Get a simulated session object to pass into the script.
     sim_session = direct_script.get_main_session()
     # Run script's main logic against our session
-    script_main(sim_session)
-    # Shutdown logging after
-    logging.shutdown()
+    try:
+        script_main(sim_session)
+    finally:
+        # Write out and close the debug log, even if the script failed.
+        direct_script.close_logs()
@@ -0,0 +1,79 @@
+"""
+This module contains a short-lived cache of command outputs, keyed by the connection to the device, the hostname of the
+device and the command that was sent.  It is used by the session objects so that when several scripts (or several passes
+of one script) run against the same device in a short window, large outputs like "show run" are not captured from the
+device again.
+
+The connection is what the session was connected to (the host and proxy session passed to connect(), or the remote
+address of the tab), so that different devices that happen to have the same hostname (such as a factory default
+"Switch") never share outputs.
+
+The cache is only used when the "command_cache_ttl" setting under [Global] is greater than 0 (the number of seconds an
+output stays valid).  Entries for a connection are dropped whenever configuration is sent to or saved on that device,
+and when the session is disconnected.
+"""
+
+import time
+
+
+# Maps (connection, hostname, command) to a (timestamp, output) tuple.
+_cache = {}
+
+
+def get(connection, hostname, command, ttl):
+    """
+    Returns the cached output for a command on a device, if it was stored less than "ttl" seconds ago.
+
+    :param connection: Identifies the connection to the device (e.g. a (host, proxy) tuple)
+    :type connection: tuple
+    :param hostname: The hostname of the device the command was sent to
+    :type hostname: str
+    :param command: The command that was sent to the device
+    :type command: str
+    :param ttl: How many seconds a cached output is considered valid
+    :type ttl: int
+
+    :return: The cached output, or None if nothing valid is cached.
+    :rtype: str
+    """
+    key = (connection, hostname, command)
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    timestamp, output = entry
+    if time.time() - timestamp > ttl:
+        del _cache[key]
+        return None
+    return output
+
+
+def put(connection, hostname, command, output):
+    """
+    Stores the output of a command sent to a device.
+
+    :param connection: Identifies the connection to the device (e.g. a (host, proxy) tuple)
+    :type connection: tuple
+    :param hostname: The hostname of the device the command was sent to
+    :type hostname: str
+    :param command: The command that was sent to the device
+    :type command: str
+    :param output: The output that was received from the device
+    :type output: str
+    """
+    _cache[(connection, hostname, command)] = (time.time(), output)
+
+
+def invalidate(connection=None):
+    """
+    Removes cached outputs for a connection (or for all connections, if none is given).  This should be called whenever
+    the state of the device may have changed, such as after sending configuration commands, or when the session is
+    disconnected.
+
+    :param connection: The connection whose outputs should be removed.  Default: all connections
+    :type connection: tuple
+    """
+    if connection is None:
+        _cache.clear()
+    else:
+        for key in [key for key in _cache if key[0] == connection]:
+            del _cache[key]
@@ -6,17 +6,31 @@ remote devices.
 """
 
 import os
+import re
+import stat
 import sys
 import logging
+import logging.handlers
+import queue
 import datetime
 import csv
+import itertools
 import getpass
+from collections import namedtuple
 from abc import ABCMeta, abstractmethod
 from . import sessions
+from .sessions import CRTSession, InteractionError
 from .settings import SettingsImporter
 from .message_box_const import *
 
 
+# Protocol values accepted in the device list CSV (an empty protocol tries SSH2, then SSH1, then Telnet).
+_VALID_PROTOCOLS = frozenset(('', 'ssh', 'ssh1', 'ssh2', 'telnet'))
+
+# A device from the device list CSV, as returned by Script.import_device_list().  "extra" is a dictionary of any other
+# columns in the CSV file (such as 'Command List'), keyed by the column name.
+Device = namedtuple("Device", "hostname protocol username password enable proxy extra")
+
 # ################################################    EXCEPTIONS     ###################################################
 
 
@@ -33,6 +47,90 @@ class ConnectError(Exception):
     pass
 
 
+# ################################################  HELPER FUNCTIONS  ##################################################
+
+# Maps the path of a settings file to a (modification time, SettingsImporter) tuple, so the file is only parsed again
+# when it has changed since the last Script was created in this Python session.
+_SETTINGS_CACHE = {}
+
+
+def _load_settings(settings_file):
+    """
+    Returns the SettingsImporter for a settings file, re-using the one already loaded in this Python session if the
+    file has not been modified since.
+
+    :param settings_file: The path to the settings.ini file
+    :type settings_file: str
+
+    :return: The settings loaded from the file
+    :rtype: SettingsImporter
+    """
+    # os.stat() raises FileNotFoundError (an IOError) if the file is missing, same as SettingsImporter would.
+    mtime = os.stat(settings_file).st_mtime_ns
+    cached = _SETTINGS_CACHE.get(settings_file)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    settings = SettingsImporter(settings_file)
+    # Stat again, since SettingsImporter re-writes the file when it is missing any of the default settings.
+    _SETTINGS_CACHE[settings_file] = (os.stat(settings_file).st_mtime_ns, settings)
+    return settings
+
+
+# Maps a (script directory, output_dir setting) pair to the resolved output directory path.
+_RESOLVED_OUTDIR_CACHE = {}
+
+
+def _resolve_output_dir(script_dir, output_dir):
+    """
+    Returns the full path for the output_dir setting, expanding any "~" or environment variables in it.  Relative
+    paths are taken from the script directory.  The result is cached for the rest of this Python session.
+
+    :param script_dir: The directory that the scripts are located in
+    :type script_dir: str
+    :param output_dir: The output_dir value from the settings file
+    :type output_dir: str
+
+    :return: The full path to the output directory
+    :rtype: str
+    """
+    key = (script_dir, output_dir)
+    resolved = _RESOLVED_OUTDIR_CACHE.get(key)
+    if resolved is None:
+        exp_output_dir = os.path.expandvars(os.path.expanduser(output_dir))
+        resolved = os.path.realpath(os.path.join(script_dir, exp_output_dir))
+        _RESOLVED_OUTDIR_CACHE[key] = resolved
+    return resolved
+
+
+# ################################################  LOGGING HANDLERS  ##################################################
+
+class _QueueLogHandler(logging.handlers.QueueHandler):
+    """
+    A QueueHandler that starts a QueueListener to pass its records on to the real handlers (e.g. the debug log file) in
+    a background thread, so formatting and writing log messages doesn't slow down the script itself.  Closing this
+    handler (which close_logs() or logging.shutdown() does) stops the listener after it has written all the queued
+    records, and then closes the handlers it was writing to -- including the target of a MemoryHandler, which
+    MemoryHandler.close() only flushes and lets go of, leaving its log file open.
+    """
+    def __init__(self, *handlers):
+        log_queue = queue.Queue(-1)
+        super().__init__(log_queue)
+        self.listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                target = getattr(handler, "target", None)
+                handler.close()
+                if target is not None:
+                    target.close()
+            self.listener = None
+        super().close()
+
+
 # ################################################    APP  CLASSES    ##################################################
 
 class Script(metaclass=ABCMeta):
@@ -78,14 +176,25 @@ class Script(metaclass=ABCMeta):
     def __init__(self, script_path):
         # Initialize application attributes
         self.script_dir, self.script_name = os.path.split(script_path)
-        self.logger = logging
+        # Only WARNING and above are logged unless debug mode is enabled (below), so debug calls return right away.
+        self.logger = logging.getLogger("securecrt")
+        self.logger.setLevel(logging.WARNING)
         self.main_session = None
         self.host_os = sys.platform
+        # Directories that validate_dir() has already found (or created), so they aren't checked again.
+        self._valid_dirs = set()
+        # Passwords (by username) and default credentials entered while importing device lists, so the user isn't
+        # prompted for them again if another device list is imported by this script.
+        self._credentials = {}
+        self._default_username = None
+        self._default_enable = None
+        # Maps TextFSM template filenames to their full paths.  Filled in the first time get_template() is called.
+        self._template_index = None
 
         # Load Settings
         settings_file = os.path.join(self.script_dir, "settings", "settings.ini")
         try:
-            self.settings = SettingsImporter(settings_file)
+            self.settings = _load_settings(settings_file)
         except IOError:
             error_msg = "A settings file at {0} does not exist.  Do you want to create it?".format(settings_file)
             result = self.message_box(error_msg, "Missing Settings File", ICON_QUESTION | BUTTON_YESNO)
@@ -101,27 +210,38 @@ class Script(metaclass=ABCMeta):
 
         # Extract and store "save path" for future reference by scripts.
         output_dir = self.settings.get("Global", "output_dir")
-        exp_output_dir = os.path.expandvars(os.path.expanduser(output_dir))
-        if os.path.isabs(exp_output_dir):
-            self.output_dir = os.path.realpath(exp_output_dir)
-        else:
-            full_path = os.path.join(self.script_dir, exp_output_dir)
-            self.output_dir = os.path.realpath(full_path)
+        self.output_dir = _resolve_output_dir(self.script_dir, output_dir)
         self.validate_dir(self.output_dir)
 
+        # Remove (and close) log handlers left by an earlier Script in this Python session, so messages aren't written
+        # more than once, or to an earlier script's log file.
+        self.close_logs()
+
         # Check if Debug Mode is enabled.
         if self.settings.getboolean("Global", "debug_mode"):
             self.debug_dir = os.path.join(self.output_dir, "debugs")
             self.validate_dir(self.debug_dir)
             log_file = os.path.join(self.debug_dir, self.script_name.replace(".py", "-debug.txt"))
-            self.logger = logging.getLogger("securecrt")
             self.logger.propagate = False
             self.logger.setLevel(logging.DEBUG)
             formatter = logging.Formatter('%(asctime)s - %(message)s', datefmt='%m/%d/%Y %I:%M:%S')
             fh = logging.FileHandler(log_file, mode='w')
             fh.setFormatter(formatter)
-            self.logger.addHandler(fh)
-            self.logger.debug("<SCRIPT_INIT> Starting Logging. Running Python version: {0}".format(sys.version))
+            # Hold records in memory and write them to the file in batches (or right away for errors).
+            mh = logging.handlers.MemoryHandler(1024, flushLevel=logging.ERROR, target=fh)
+            # Log messages are queued and written to the file from a separate thread.
+            self.logger.addHandler(_QueueLogHandler(mh))
+            self.logger.debug("<SCRIPT_INIT> Starting Logging. Running Python version: %s", sys.version)
+
+    def close_logs(self):
+        """
+        Removes and closes the handlers of the "securecrt" logger, which writes any log messages still held in memory to
+        the debug log file.  This should be called when the script finishes, even if it failed with an exception (the
+        launch blocks call it from a "finally" clause).
+        """
+        for handler in self.logger.handlers[:]:
+            self.logger.removeHandler(handler)
+            handler.close()
 
     def get_main_session(self):
         """
@@ -142,24 +262,30 @@ class Script(metaclass=ABCMeta):
         :param path: A directory path (not including filename) to be validated
         :type path: str
         """
+        if path in self._valid_dirs:
+            return
 
-        self.logger.debug("<VALIDATE_PATH> Starting validation of path: {0}".format(path))
+        self.logger.debug("<VALIDATE_PATH> Starting validation of path: %s", path)
 
         # Verify that base_path is valid absolute path, or else error and exit.
         if not os.path.isabs(path):
-            self.logger.debug("<VALIDATE_PATH> Supplied path is not an absolute path. Raising exception".format(path))
+            self.logger.debug("<VALIDATE_PATH> Supplied path is not an absolute path. Raising exception")
             error_str = 'Directory {0} is invalid.'.format(path)
             raise IOError(error_str)
 
-        # Check if directory exists.  If not, prompt to create it.
-        if not os.path.exists(os.path.normpath(path)):
+        # Check if directory exists (with a single stat call).  If not, prompt to create it.
+        try:
+            if not stat.S_ISDIR(os.stat(path).st_mode):
+                self.logger.debug("<VALIDATE_PATH> Supplied path is not a directory. Raising exception")
+                raise IOError('{0} is not a directory.'.format(path))
+        except FileNotFoundError:
             if prompt_to_create:
                 self.logger.debug("<VALIDATE_PATH> Supplied directory path does not exist. Prompting User.")
                 message_str = "The path: '{0}' does not exist.  Do you want to create it?.".format(path)
                 result = self.message_box(message_str, "Create Directory?", ICON_QUESTION | BUTTON_YESNO | DEFBUTTON2)
 
                 if result == IDYES:
-                    self.logger.debug("<VALIDATE_PATH> User chose to create directory.".format(path))
+                    self.logger.debug("<VALIDATE_PATH> User chose to create directory.")
                     os.makedirs(path)
                 else:
                     self.logger.debug("<VALIDATE_PATH> User chose NOT to create directory.  Raising exception")
@@ -167,10 +293,11 @@ class Script(metaclass=ABCMeta):
                     raise IOError(error_str)
             else:
                 self.logger.debug("<VALIDATE_PATH> Supplied directory path does not exist. Prompting User OVERRIDDEN")
-                self.logger.debug("<VALIDATE_PATH> Creating directory.".format(path))
+                self.logger.debug("<VALIDATE_PATH> Creating directory.")
                 os.makedirs(path)
 
         self.logger.debug("<VALIDATE_PATH> Path is Valid.")
+        self._valid_dirs.add(path)
 
     def get_template(self, name):
         """
@@ -182,8 +309,17 @@ class Script(metaclass=ABCMeta):
         :return: Full path to the template location
         :rtype: str
         """
-        path = os.path.abspath(os.path.join(self.script_dir, "textfsm-templates", name))
-        if os.path.isfile(path):
+        # List the template directory once, instead of checking the disk for each template that is requested.
+        if self._template_index is None:
+            template_dir = os.path.abspath(os.path.join(self.script_dir, "textfsm-templates"))
+            try:
+                with os.scandir(template_dir) as entries:
+                    self._template_index = {entry.name: entry.path for entry in entries if entry.is_file()}
+            except FileNotFoundError:
+                self._template_index = {}
+
+        path = self._template_index.get(name)
+        if path:
             return path
         else:
             raise IOError("The template name {0} does not exist.".format(name))
@@ -206,8 +342,16 @@ class Script(metaclass=ABCMeta):
         - If the enable password is missing, the method will ask the user if they want to set a default enable to use
         - If the IP is included then the device will be reached through the jumpbox, otherwise connect directly.
 
-        :return: A list where each entry is a dictionary representing a device and the associated login information.
-        :rtype: list of dict
+        If the "sort_device_list" setting is True, the returned list is sorted by proxy session, then protocol, then
+        hostname, so that devices reached the same way are connected to one after another.  Otherwise the devices are
+        returned in the order they appear in the CSV file.
+
+        The CSV file is read as UTF-8.  A byte order mark at the start of the file (as saved by Excel) is ignored.  The
+        device list must be saved as UTF-8 ('CSV UTF-8' in Excel), otherwise a ScriptError is raised.
+
+        :return: A list where each entry is a Device (namedtuple) representing a device and the associated login
+            information.
+        :rtype: list of Device
         """
         # Get the filename of the device list CSV file.
         self.logger.debug("<IMPORT_DEVICES> Prompting for input CSV file.")
@@ -225,93 +369,124 @@ class Script(metaclass=ABCMeta):
         # The username that will be used when one isn't given in the CSV.  This will be prompted for when an empty
         # username field is found.
         device_list = []
-        default_username = None
-        default_enable = None
-        prompt_enable = True
-        credentials = {}
+        default_username = self._default_username
+        default_enable = self._default_enable
+        credentials = self._credentials
         required_header = {'Hostname', 'Protocol', 'Username'}
 
         # Extract the list of devices into a data structure we can use (and fill in any gaps needed).
-        with open(device_list_filename, 'r') as device_file:
-            device_csv = csv.DictReader(device_file)
-
-            # Get a list of all the header values found in the CSV in lowercase.
-            header = set(device_csv.fieldnames)
-            if required_header.difference(header):
-                raise ScriptError("CSV file does not have a valid header row.\n"
-                                  "Please see the documentation or the templates/sample_device_list.csv file for an "
-                                  "example")
-
-            line = 0
-            for entry in device_csv:
-                line += 1
-
-                if not entry['Hostname']:
-                    self.logger.debug("<IMPORT_DEVICES> Skipping CSV line {0} because no hostname exists.".format(line))
-                    skipped_lines += 1
-                    continue
-
-                if entry['Protocol'].lower() not in ['', 'ssh', 'ssh1', 'ssh2', 'telnet']:
-                    self.logger.debug("<IMPORT_DEVICES> Skipping CSV line {0} because no valid protocol.".format(line))
-                    skipped_lines += 1
-                    continue
-
-                if not entry['Username']:
-                    if default_username:
-                        entry['Username'] = default_username
-                        self.logger.debug("<IMPORT_DEVICES> Using default username '{0}', for host {1}."
-                                          .format(default_username, entry['Hostname']))
+        # The csv module handles line endings itself, so the file is opened with newline=''.
+        try:
+            with open(device_list_filename, 'r', newline='', buffering=1 << 16, encoding='utf-8-sig') as device_file:
+                device_csv = csv.reader(device_file)
+
+                # Map each column name in the header row to its position, so values can be read directly from each
+                # row.
+                header = next(device_csv, [])
+                idx = {name: index for index, name in enumerate(header)}
+                if required_header.difference(idx):
+                    raise ScriptError("CSV file does not have a valid header row.\n"
+                                      "Please see the documentation or the templates/sample_device_list.csv file for "
+                                      "an example")
+                row_width = len(header)
+                # Optional columns
+                has_password = "Password" in idx
+                has_enable = "Enable" in idx
+                has_proxy = "Proxy Session" in idx
+                # Any other columns (such as 'Command List' for document_device) are passed along with each device
+                # as-is.
+                extra_columns = [(name, index) for name, index in idx.items()
+                                 if name not in ('Hostname', 'Protocol', 'Username', 'Password', 'Enable',
+                                                 'Proxy Session')]
+
+                # Read in all the (non-blank) rows, padding out short rows so any missing trailing fields are read as
+                # empty values.
+                rows = []
+                for row in device_csv:
+                    if row:
+                        if len(row) < row_width:
+                            row += [""] * (row_width - len(row))
+                        rows.append(row)
+        except UnicodeDecodeError:
+            raise ScriptError("Could not read the device list CSV file, {0}.\n"
+                              "The device list must be saved as UTF-8 ('CSV UTF-8' in Excel)."
+                              .format(device_list_filename))
+
+        # Bind methods used on every row to local names.
+        debug = self.logger.debug
+        append = device_list.append
+
+        hostname_idx = idx['Hostname']
+        protocol_idx = idx['Protocol']
+        username_idx = idx['Username']
+        device_rows = [row for row in rows if row[hostname_idx] and row[protocol_idx].lower() in _VALID_PROTOCOLS]
+
+        # Check all the devices first to see if a default username or enable password is needed, so the user is only
+        # prompted once, before any other processing.
+        if not default_username and any(not row[username_idx] for row in device_rows):
+            debug("<IMPORT_DEVICES> Found hosts without usernames.  Prompting for DEFAULT.")
+            default_username = self.prompt_window("Enter the DEFAULT USERNAME to use.")
+            if not default_username:
+                debug("<IMPORT_DEVICES> Default username not provided.  Stopping")
+                error = "Found hosts without usernames and no default username provided."
+                raise ScriptError(error)
+
+        missing_enable = not has_enable or any(not row[idx['Enable']] for row in device_rows)
+        if device_rows and missing_enable and not default_enable:
+            debug("<IMPORT_DEVICES> Devices without enable passwords found.  Prompting for password.")
+            enable_msg = "Devices were found without enable passwords listed.  Do you want to enter a " \
+                         "default enable password?"
+            result = self.message_box(enable_msg, "No Enable PW", BUTTON_YESNO | ICON_QUESTION)
+            if result == IDYES:
+                default_enable = self.prompt_window("Enter default ENABLE password", "Enter Enable", hide_input=True)
+
+        for line, row in enumerate(rows, 1):
+            hostname = row[hostname_idx]
+            if not hostname:
+                debug("<IMPORT_DEVICES> Skipping CSV line %s because no hostname exists.", line)
+                skipped_lines += 1
+                continue
+
+            protocol = row[protocol_idx]
+            if protocol.lower() not in _VALID_PROTOCOLS:
+                debug("<IMPORT_DEVICES> Skipping CSV line %s because no valid protocol.", line)
+                skipped_lines += 1
+                continue
+
+            username = row[username_idx]
+            if not username:
+                username = default_username
+                debug("<IMPORT_DEVICES> Using default username '%s', for host %s.", default_username, hostname)
+
+            password = row[idx['Password']] if has_password else ""
+            if not password:
+                password = credentials.get(username)
+                if password is None:
+                    debug("<IMPORT_DEVICES> Prompting for password for username '%s'", username)
+                    password = self.prompt_window("Enter the password for USER: {0}".format(username), hide_input=True)
+                    if password:
+                        credentials[username] = password
                     else:
-                        self.logger.debug(
-                            "<IMPORT_DEVICES> Didn't find username for host '{0}'.  Prompting for DEFAULT."
-                            .format(entry['Hostname']))
-                        default_username = self.prompt_window("Enter the DEFAULT USERNAME to use.")
-                        if not default_username:
-                            self.logger.debug("<IMPORT_DEVICES> Default username not provided.  Stopping".format(line))
-                            error = "Found hosts without usernames and no default username provided."
-                            raise ScriptError(error)
-                        else:
-                            self.logger.debug("<IMPORT_DEVICES> Using default username '{0}', for host {1}."
-                                              .format(default_username, entry['Hostname']))
-                            entry['Username'] = default_username
-
-                if "Password" not in header:
-                    entry['Password'] = ""
-                if not entry['Password']:
-                    try:
-                        entry['Password'] = credentials[entry['Username']]
-                    except KeyError:
-                        self.logger.debug("<IMPORT_DEVICES> Prompting for password for username '{0}'"
-                                          .format(entry['Username']))
-                        password = self.prompt_window("Enter the password for USER: {0}".format(entry['Username']),
-                                                      hide_input=True)
-                        if password:
-                            credentials[entry['Username']] = password
-                            entry['Password'] = password
-                        else:
-                            self.logger.debug("<IMPORT_DEVICES> Skipping {0}.  No password for user.".format(line[0]))
-                            skipped_lines += 1
-                            continue
-
-                if "Enable" not in header:
-                    entry['Enable'] = ""
-                if not entry["Enable"]:
-                    if default_enable:
-                        entry["Enable"] = default_enable
-                    elif prompt_enable:
-                        self.logger.debug(
-                            "<IMPORT_DEVICES> Devices without enable passwords found.  Prompting for password.")
-                        enable_msg = "Devices were found without enable passwords listed.  Do you want to enter a " \
-                                     "default enable password?"
-                        result = self.message_box(enable_msg, "No Enable PW", BUTTON_YESNO | ICON_QUESTION)
-                        if result == IDYES:
-                            default_enable = self.prompt_window("Enter default ENABLE password", "Enter Enable",
-                                                                hide_input=True)
-                            entry["Enable"] = default_enable
-                        else:
-                            prompt_enable = False
-
-                device_list.append(entry)
+                        debug("<IMPORT_DEVICES> Skipping line %d.  No password for user.", line)
+                        skipped_lines += 1
+                        continue
+
+            enable = row[idx['Enable']] if has_enable else ""
+            if not enable and default_enable:
+                enable = default_enable
+
+            proxy = row[idx['Proxy Session']] if has_proxy else ""
+
+            append(Device(hostname, protocol, username, password, enable, proxy,
+                          {name: row[index] for name, index in extra_columns}))
+
+        # Remember the defaults that were entered, for any later device list imports.
+        self._default_username = default_username
+        self._default_enable = default_enable
+
+        # Group devices that use the same proxy session and protocol together, unless the CSV order should be kept.
+        if self.settings.getboolean("Global", "sort_device_list"):
+            device_list.sort(key=lambda device: (device.proxy, device.protocol.lower(), device.hostname))
 
         # Give stats on how many devices were found and prompt user before going forward with connections.
         validate_message = "{0} devices found in CSV.\n" \
@@ -513,8 +688,29 @@ class CRTScript(Script):
         super(CRTScript, self).__init__(crt.ScriptFullName)
         self.logger.debug("<SCRIPT_INIT> Starting creation of CRTScript object")
 
+        # Prompt endings expanded with a trailing space, keyed by the original prompt endings.
+        self._ending_cache = {}
+
         # Set up SecureCRT tab for interaction with the scripts
-        self.main_session = sessions.CRTSession(self, self.crt.GetScriptTab())
+        self.main_session = CRTSession(self, self.crt.GetScriptTab())
+
+    def __expand_endings(self, prompt_endings):
+        """
+        Returns the prompt endings along with a version of each one followed by a space, since either may be at the end
+        of the prompt.  The result is cached, because the same endings are used for every connection attempt.
+
+        :param prompt_endings: A list of strings that are possible prompt endings
+        :type prompt_endings: list
+
+        :return: The expanded prompt endings
+        :rtype: list
+        """
+        key = tuple(prompt_endings)
+        expanded_endings = self._ending_cache.get(key)
+        if expanded_endings is None:
+            expanded_endings = list(itertools.chain.from_iterable((ending, ending + " ") for ending in key))
+            self._ending_cache[key] = expanded_endings
+        return expanded_endings
 
     def __post_connect_check(self, endings):
         """
@@ -524,28 +720,40 @@ class CRTScript(Script):
                         of the CLI prompt for the remote device.
         :type endings: list
         """
-        self.logger.debug("<CONN_CHECK> Started looking for following prompt endings: {0}".format(endings))
+        self.logger.debug("<CONN_CHECK> Started looking for following prompt endings: %s", endings)
+        screen = self.main_session.screen
+        timeout = self.main_session.response_timeout
+        # A line that is only a prompt, i.e. a hostname-like name followed directly by one of the endings.  The name must
+        # start with a letter or number, so banner borders such as "#####" or "===>" are not mistaken for a prompt.
+        prompt_re = re.compile(r"^[A-Za-z0-9][\w.\-/:()]*(?:{0})$".format(
+            "|".join(re.escape(ending.strip()) for ending in endings if ending.strip())))
         at_prompt = False
         while not at_prompt:
-            found = self.main_session.screen.WaitForStrings(endings, self.main_session.response_timeout)
+            found = screen.WaitForStrings(endings, timeout)
             if not found:
-                raise sessions.InteractionError("Timeout reached looking for prompt endings: {0}".format(endings))
+                raise InteractionError("Timeout reached looking for prompt endings: {0}".format(endings))
+
+            # If the line the cursor is on already looks like a prompt we are done, without waiting on a round trip
+            # to the device.
+            row, col = screen.CurrentRow, screen.CurrentColumn
+            if col > 1 and prompt_re.match(screen.Get(row, 1, row, col - 1).strip()):
+                self.logger.debug("<CONN_CHECK> At prompt.  Continuing")
+                at_prompt = True
             else:
+                # Otherwise the ending may have been part of a login banner.  Send a test string (and erase it) to
+                # confirm that the device is waiting for input at the prompt.
                 test_string = "!@&^"
-                self.main_session.screen.Send(test_string + "\b" * len(test_string))
-                result = self.main_session.screen.WaitForStrings(test_string, self.main_session.response_timeout)
+                screen.Send(test_string + "\b" * len(test_string))
+                result = screen.WaitForStrings(test_string, timeout)
                 if result:
-                    self.logger.debug("<CONN_CHECK> At prompt.  Continuing".format(result))
+                    self.logger.debug("<CONN_CHECK> At prompt.  Continuing")
                     at_prompt = True
 
     def __connect_ssh_2(self, host, username, password, proxy=None, prompt_endings=("#", "# ", ">")):
         if not prompt_endings:
             raise ConnectError("Cannot connect without knowing what character ends the CLI prompt.")
 
-        expanded_endings = []
-        for ending in prompt_endings:
-            expanded_endings.append("{0}".format(ending))
-            expanded_endings.append("{0} ".format(ending))
+        expanded_endings = self.__expand_endings(prompt_endings)
 
         # If we have a proxy object, verify
         if proxy:
@@ -560,10 +768,11 @@ class CRTScript(Script):
             raise ConnectError("Tab is already connected to another device.")
         else:
             try:
-                self.logger.debug("<CONNECT_SSH2> Attempting Connection to: {0}@{1} via SSH2".format(username, host))
+                self.logger.debug("<CONNECT_SSH2> Attempting Connection to: %s@%s via SSH2", username, host)
                 tab = self.main_session.session.ConnectInTab(ssh2_string)
                 tab_index = tab.Index
-                self.main_session = sessions.CRTSession(self, self.crt.GetTab(tab_index), prompt_endings=prompt_endings)
+                self.main_session = CRTSession(self, self.crt.GetTab(tab_index), prompt_endings=prompt_endings)
+                self.main_session.connection_id = (host, proxy)
             except:
                 error = self.crt.GetLastErrorMessage()
                 raise ConnectError(error)
@@ -581,10 +790,7 @@ class CRTScript(Script):
         if not prompt_endings:
             raise ConnectError("Cannot connect without knowing what character ends the CLI prompt.")
 
-        expanded_endings = []
-        for ending in prompt_endings:
-            expanded_endings.append("{0}".format(ending))
-            expanded_endings.append("{0} ".format(ending))
+        expanded_endings = self.__expand_endings(prompt_endings)
 
         if proxy:
             ssh1_string="/FIREWALL=Session:\"{0}\" /SSH1 /ACCEPTHOSTKEYS /L {0} /PASSWORD {1} {2}".format(proxy, username,
@@ -598,10 +804,11 @@ class CRTScript(Script):
             raise ConnectError("Tab is already connected to another device.")
         else:
             try:
-                self.logger.debug("<CONNECT_SSH1> Attempting Connection to: {0}@{1} via SSH1".format(username, host))
+                self.logger.debug("<CONNECT_SSH1> Attempting Connection to: %s@%s via SSH1", username, host)
                 tab = self.main_session.session.ConnectInTab(ssh1_string)
                 tab_index = tab.Index
-                self.main_session = sessions.CRTSession(self, self.crt.GetTab(tab_index), prompt_endings=prompt_endings)
+                self.main_session = CRTSession(self, self.crt.GetTab(tab_index), prompt_endings=prompt_endings)
+                self.main_session.connection_id = (host, proxy)
             except:
                 error = self.crt.GetLastErrorMessage()
                 raise ConnectError(error)
@@ -638,7 +845,7 @@ class CRTScript(Script):
                                type of device (for example "$" for some linux hosts).
         :type prompt_endings: list
         """
-        self.logger.debug("<CONNECT_SSH> Attempting Connection to: {0}@{1}".format(username, host))
+        self.logger.debug("<CONNECT_SSH> Attempting Connection to: %s@%s", username, host)
 
         if not prompt_endings:
             raise ConnectError("Cannot connect without knowing what character ends the CLI prompt.")
@@ -651,13 +858,13 @@ class CRTScript(Script):
             try:
                 self.__connect_ssh_2(host, username, password, proxy=proxy, prompt_endings=prompt_endings)
             except ConnectError as e:
-                self.logger.debug("<CONNECT_SSH> Failure trying SSH2: {0}".format(e.message))
-                ssh2_error = e.message
+                self.logger.debug("<CONNECT_SSH> Failure trying SSH2: %s", e)
+                ssh2_error = str(e)
                 try:
                     self.__connect_ssh_1(host, username, password, proxy=proxy, prompt_endings=prompt_endings)
                 except ConnectError as e:
-                    ssh1_error = e.message
-                    self.logger.debug("<CONNECT_SSH> Failure trying SSH1: {0}".format(e.message))
+                    ssh1_error = str(e)
+                    self.logger.debug("<CONNECT_SSH> Failure trying SSH1: %s", e)
                     error = "SSH2 and SSH1 failed.\nSSH2 Failure:{0}\nSSH1 Failure:{1}".format(ssh2_error, ssh1_error)
                     raise ConnectError(error)
 
@@ -695,10 +902,11 @@ class CRTScript(Script):
             raise ConnectError("Tab is already connected to another device.")
         else:
             try:
-                self.logger.debug("<CONNECT_TELNET> Attempting Connection to: {0} via TELNET".format(host))
+                self.logger.debug("<CONNECT_TELNET> Attempting Connection to: %s via TELNET", host)
                 tab = self.main_session.session.ConnectInTab(telnet_string)
                 tab_index = tab.Index
-                self.main_session = sessions.CRTSession(self, self.crt.GetTab(tab_index), prompt_endings=prompt_endings)
+                self.main_session = CRTSession(self, self.crt.GetTab(tab_index), prompt_endings=prompt_endings)
+                self.main_session.connection_id = (host, proxy)
             except:
                 error = self.crt.GetLastErrorMessage()
                 raise ConnectError(error)
@@ -786,8 +994,8 @@ class CRTScript(Script):
         :return: The return code that identifies which button the user pressed. (See Message Box constants)
         :rtype: int
         """
-        self.logger.debug("<MESSAGE_BOX> Creating MessageBox with: \nTitle: {0}\nMessage: {1}\nOptions: {2}"
-                          .format(title, message, options))
+        self.logger.debug("<MESSAGE_BOX> Creating MessageBox with: \nTitle: %s\nMessage: %s\nOptions: %s",
+                          title, message, options)
         return self.crt.Dialog.MessageBox(message, title, options)
 
     def prompt_window(self, message, title="", hide_input=False):
@@ -806,9 +1014,9 @@ class CRTScript(Script):
         :return: The value entered by the user
         :rtype: str
         """
-        self.logger.debug("<PROMPT> Creating Prompt with message: '{0}'".format(message))
+        self.logger.debug("<PROMPT> Creating Prompt with message: '%s'", message)
         result = self.crt.Dialog.Prompt(message, title, "", hide_input)
-        self.logger.debug("<PROMPT> Captures prompt results: '{0}'".format(result))
+        self.logger.debug("<PROMPT> Captures prompt results: '%s'", result)
         return result
 
     def file_open_dialog(self, title, button_label="Open", default_filename="", file_filter=""):
@@ -832,7 +1040,7 @@ class CRTScript(Script):
         :return: The absolute path to the file that was selected
         :rtype: str
         """
-        self.logger.debug("<FILE_OPEN> Creating File Open Dialog with title: '{0}'".format(title))
+        self.logger.debug("<FILE_OPEN> Creating File Open Dialog with title: '%s'", title)
         if 'darwin' in self.host_os:
             self.message_box(title, "Select File", ICON_INFO)
         result_filename = self.crt.Dialog.FileOpenDialog(title, button_label, default_filename, file_filter)
@@ -864,7 +1072,7 @@ class CRTScript(Script):
         new_session.SetOption("Description", desc)
         session_path = os.path.join(folder, session_name)
         # Save session based on passed folder and session name.
-        self.logger.debug("<CREATE_SESSION> Creating new session '{0}'".format(session_path))
+        self.logger.debug("<CREATE_SESSION> Creating new session '%s'", session_path)
         new_session.Save(session_path)
 
 
@@ -916,6 +1124,7 @@ class DebugScript(Script):
             print("Pretending to log into device {0} with username {1} using SSH2.".format(host, username))
         self.main_session.hostname = host
         self.main_session.prompt = host + "#"
+        self.main_session.connection_id = (host, proxy)
         self.main_session._connected = True
 
     def connect_telnet(self, host, username, password, proxy=None, prompt_endings=("#", ">")):
@@ -941,6 +1150,7 @@ class DebugScript(Script):
         print("Pretending to log into device {0} with username {1} using TELNET.".format(host, username))
         self.main_session.hostname = host
         self.main_session.prompt = host + "#"
+        self.main_session.connection_id = (host, proxy)
         self.main_session._connected = True
 
     def connect(self, host, username, password, protocol=None, proxy=None, prompt_endings=("#", ">")):
@@ -973,6 +1183,7 @@ class DebugScript(Script):
             print("Pretending to log into device {0} with username {1} using ANY.".format(host, username, protocol))
         else:
             print("Pretending to log into device {0} with username {1} using {2}.".format(host, username, protocol))
+        self.main_session.connection_id = (host, proxy)
         self.main_session._connected = True
 
     def disconnect(self, command="exit"):
@@ -1018,11 +1229,11 @@ class DebugScript(Script):
                          "Ignore": IDIGNORE}
             return responses[text]
 
-        self.logger.debug("<MESSAGEBOX> Creating Message Box, with Title: {0}, Message: {1}, and Options: {2}"
-                          .format(title, message, options))
+        self.logger.debug("<MESSAGEBOX> Creating Message Box, with Title: %s, Message: %s, and Options: %s",
+                          title, message, options)
         # Extract the layout paramter in the options field
         layout = get_button_layout(options)
-        self.logger.debug("<MESSAGEBOX> Layout Value is: {0}".format(layout))
+        self.logger.debug("<MESSAGEBOX> Layout Value is: %s", layout)
 
         # A mapping of each integer value and which buttons are shown in a MessageBox, so we can prompt for the
         # same values from the console
@@ -1035,10 +1246,10 @@ class DebugScript(Script):
         response = ""
         while response not in buttons[layout]:
             response = input("Choose from {0}: ".format(buttons[layout]))
-            self.logger.debug("<MESSAGEBOX> Received: {0}".format(response))
+            self.logger.debug("<MESSAGEBOX> Received: %s", response)
 
         code = get_response_code(response)
-        self.logger.debug("<MESSAGEBOX> Returning Response Code: {0}".format(code))
+        self.logger.debug("<MESSAGEBOX> Returning Response Code: %s", code)
         return code
 
     def prompt_window(self, message, title="", hide_input=False):
@@ -1057,13 +1268,13 @@ class DebugScript(Script):
         :return: The value entered by the user
         :rtype: str
         """
-        self.logger.debug("<PROMPT> Creating Prompt with message: '{0}'".format(message))
+        self.logger.debug("<PROMPT> Creating Prompt with message: '%s'", message)
         if hide_input:
             result = getpass.getpass(message)
-            self.logger.debug("<PROMPT> Captures hidden result (likely a password)".format(result))
+            self.logger.debug("<PROMPT> Captures hidden result (likely a password)")
         else:
             result = input("{0}: ".format(message))
-            self.logger.debug("<PROMPT> Captures prompt results: '{0}'".format(result))
+            self.logger.debug("<PROMPT> Captures prompt results: '%s'", result)
 
         return result
 
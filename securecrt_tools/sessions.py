@@ -28,6 +28,7 @@ import logging
 import time
 import re
 from abc import ABCMeta, abstractmethod
+from . import command_cache
 from .message_box_const import *
 from .utilities import path_safe_name
 
@@ -65,6 +66,8 @@ class Session(metaclass=ABCMeta):
         self.prompt = None
         self.prompt_stack = []
         self.hostname = None
+        # The host and proxy session passed to Script.connect(), if the session was connected by the script.
+        self.connection_id = None
         self.term_len = None
         self.term_width = None
         self.logger = logging.getLogger("securecrt")
@@ -129,6 +132,44 @@ class Session(metaclass=ABCMeta):
 
         return file_path
 
+    def _cache_connection(self):
+        """
+        Returns what identifies the connection to the device in the command cache: the host and proxy the session was
+        connected to by the script, or else the remote address of the session.
+        """
+        return self.connection_id or self.remote_ip
+
+    def _get_cached_output(self, command):
+        """
+        Returns the cached output of a command for this device, if the command_cache_ttl setting is enabled and a
+        recent enough output exists.
+
+        :param command: Command string that was sent to the device
+        :type command: str
+
+        :return: The cached output, or None if there is nothing valid in the cache (or caching is disabled).
+        :rtype: str
+        """
+        cache_ttl = self.script.settings.getint("Global", "command_cache_ttl")
+        if cache_ttl > 0:
+            output = command_cache.get(self._cache_connection(), self.hostname, command, cache_ttl)
+            if output is not None:
+                self.logger.debug("<GET OUTPUT> Using cached output for '{0}'".format(command))
+            return output
+        return None
+
+    def _cache_output(self, command, output):
+        """
+        Saves the output of a command for this device in the command cache, if the command_cache_ttl setting is enabled.
+
+        :param command: Command string that was sent to the device
+        :type command: str
+        :param output: The output received from the device
+        :type output: str
+        """
+        if self.script.settings.getint("Global", "command_cache_ttl") > 0:
+            command_cache.put(self._cache_connection(), self.hostname, command, output)
+
     def validate_os(self, valid_os_list):
         """
         This method checks if the remote device is running an OS in a list of valid OSes passed into the method.  If
@@ -362,6 +403,9 @@ class CRTSession(Session):
         :param command: The command to be issued to the remote device to disconnect.  The default is 'exit'
         :type command: str
         """
+        # Cached outputs only apply to this connection.
+        command_cache.invalidate(self._cache_connection())
+
         if self.is_connected():
             self.logger.debug("<DISCONNECT> Sending '{0}' command.".format(command))
             self.__send("{0}\n".format(command))
@@ -372,8 +416,12 @@ class CRTSession(Session):
         self.screen.Synchronous = False
         self.screen.IgnoreEscape = False
 
-        # Give a little time and check if we are disconnected.  If not, force it.
-        time.sleep(0.25)
+        # Give the device up to 0.25 seconds to close the connection, but move on as soon as it has.  If not, force it.
+        increment = 0.05
+        total_time = 0
+        while self.is_connected() and total_time < 0.25:
+            time.sleep(increment)
+            total_time += increment
         attempts = 0
         while self.is_connected() and attempts < 10:
             self.logger.debug("<DISCONNECT> Not disconnected.  Attempting ungraceful disconnect.")
@@ -774,8 +822,9 @@ class CRTSession(Session):
 
         # Write the output to the specified file
         try:
-            # Need the 'b' in mode 'wb', or else Windows systems add extra blank lines.
-            with open(filename, 'ab') as newfile:
+            # Need the 'b' in mode 'wb', or else Windows systems add extra blank lines.  Use a 64KB buffer, since this
+            # writes one line at a time and large outputs (e.g. "show tech") can have many thousands of lines.
+            with open(filename, 'ab', buffering=64 * 1024) as newfile:
                 self.__send(command + "\n")
 
                 # Loop to capture every line of the command.  If we get CRLF (first entry in our "endings" list), then
@@ -801,9 +850,9 @@ class CRTSession(Session):
                             # Strip line endings from line.  Also re-encode line as ASCII
                             # and ignore the character if it can't be done (rare error on
                             # Nexus)
-                            newfile.write(nextline.strip('\r\n').encode('ascii', 'ignore') + b"\n")
-                            self.logger.debug("<WRITE_FILE> Writing Line: {0}".format(nextline.strip('\r\n')
-                                                                                      .encode('ascii', 'ignore')))
+                            line_bytes = nextline.strip('\r\n').encode('ascii', 'ignore')
+                            newfile.write(line_bytes + b"\n")
+                            self.logger.debug("<WRITE_FILE> Writing Line: %s", line_bytes)
                     elif self.screen.MatchIndex > 4:
                         # If we get a --More-- send a space character
                         self.screen.Send(" ")
@@ -832,6 +881,10 @@ class CRTSession(Session):
         """
         self.logger.debug("<GET OUTPUT> Running get_command_output with input '{0}'".format(command))
 
+        cached_output = self._get_cached_output(command)
+        if cached_output is not None:
+            return cached_output
+
         # Create a temporary filename
         temp_filename = self.create_output_filename("{0}-temp".format(command))
         self.logger.debug("<GET OUTPUT> Temp Filename".format(temp_filename))
@@ -850,6 +903,7 @@ class CRTSession(Session):
         else:
             self.logger.debug("<GET OUTPUT> Deleting {0}".format(temp_filename))
             os.remove(temp_filename)
+        self._cache_output(command, result)
         self.logger.debug("<GET OUTPUT> Returning results of size {0}".format(sys.getsizeof(result)))
         return result
 
@@ -871,6 +925,8 @@ class CRTSession(Session):
         :type output_filename: str
         """
         self.logger.debug("<SEND_CMDS> Preparing to write commands to device.")
+        # Any cached outputs for this device may be out of date once the configuration changes.
+        command_cache.invalidate(self._cache_connection())
         self.logger.debug("<SEND_CMDS> Received: {0}".format(str(command_list)))
 
         # Build text commands to send to device, and book-end with "conf t" and "end"
@@ -900,6 +956,7 @@ class CRTSession(Session):
         Sends a "copy running-config startup-config" command to the remote device to save the running configuration.
         """
         self.logger.debug("<SAVE> Saving configuration on remote device.")
+        command_cache.invalidate(self._cache_connection())
         self.__send("{0}\n".format(command))
         save_results = self.__wait_for_strings(["?", self.prompt])
         if save_results == 1:
@@ -951,6 +1008,8 @@ class DebugSession(Session):
         :type command: str
         """
         print("Pretending to disconnect from device {0}.".format(self.hostname))
+        # Cached outputs only apply to this connection.
+        command_cache.invalidate(self._cache_connection())
         self._connected = False
 
     def close(self):
@@ -1054,11 +1113,11 @@ class DebugSession(Session):
         # Write the output to the specified file
         try:
             # Need the 'b' in mode 'wb', or else Windows systems add extra blank lines.
-            with open(filename, 'wb') as newfile:
+            with open(filename, 'wb', buffering=64 * 1024) as newfile:
                 for line in input_data:
-                    newfile.write(line.strip('\r\n').encode('ascii', 'ignore') + "\r\n")
-                    self.logger.debug("<WRITE OUTPUT> Writing Line: {0}".format(line.strip('\r\n')
-                                                                                .encode('ascii', 'ignore')))
+                    line_bytes = line.strip('\r\n').encode('ascii', 'ignore')
+                    newfile.write(line_bytes + b"\r\n")
+                    self.logger.debug("<WRITE OUTPUT> Writing Line: %s", line_bytes)
         except IOError as err:
             error_str = "IO Error for:\n{0}\n\n{1}".format(filename, err)
             self.script.message_box(error_str, "IO Error", ICON_STOP)
@@ -1080,6 +1139,11 @@ class DebugSession(Session):
         :rtype: str
         """
         self.logger.debug("<GET OUTPUT> Running get_command_output with input {0}".format(command))
+
+        cached_output = self._get_cached_output(command)
+        if cached_output is not None:
+            return cached_output
+
         # Create a temporary filename
         temp_filename = self.create_output_filename("{0}-temp".format(command))
         self.logger.debug("<GET OUTPUT> Temp Filename".format(temp_filename))
@@ -1095,6 +1159,7 @@ class DebugSession(Session):
         else:
             self.logger.debug("<GET OUTPUT> Deleting {0}".format(temp_filename))
             os.remove(temp_filename)
+        self._cache_output(command, result)
         self.logger.debug("<GET OUTPUT> Returning results of size {0}".format(sys.getsizeof(result)))
         return result
 
@@ -1114,6 +1179,8 @@ class DebugSession(Session):
         :type output_filename: str
         """
         self.logger.debug("<SEND CONFIG> Preparing to write commands to device.")
+        # Any cached outputs for this device may be out of date once the configuration changes.
+        command_cache.invalidate(self._cache_connection())
         self.logger.debug("<SEND CONFIG> Received: {0}".format(str(command_list)))
 
         command_string = ""
@@ -1138,4 +1205,5 @@ class DebugSession(Session):
         configuration.  Only prints to the console.
         """
         self.logger.debug("<SAVE> Simulating Saving configuration on remote device.")
+        command_cache.invalidate(self._cache_connection())
         print("Saved config.")
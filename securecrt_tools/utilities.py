@@ -9,36 +9,55 @@
 
 # ################################################     IMPORTS      ###################################################
 import csv
+import functools
 import re
 import logging
 import os
 import sys
 
-import securecrt_tools.textfsm as textfsm
-
 # Get logger instance, if enabled when main script was launched.
 logger = logging.getLogger("securecrt")
 
 
 # ################################################    FUNCTIONS     ###################################################
 
+@functools.lru_cache(maxsize=64)
+def _compiled_template(template_name):
+    """
+    Builds the TextFSM object for a template file.  The result is cached by path, so each template is only read and
+    compiled once, no matter how many times (or against how many devices) it is used.  Callers must Reset() the
+    returned object before parsing with it.
+
+    :param template_name:  Path to the template file
+    :return: The TextFSM object for the template
+    """
+    # TextFSM is only imported once a template is actually needed, so scripts that never parse output (or that are
+    # cancelled at the first prompt) don't pay for loading it at startup.
+    from securecrt_tools import textfsm
+
+    logger.debug("Compiling template at: {0}".format(template_name))
+    with open(template_name, 'r') as template:
+        return textfsm.TextFSM(template)
+
+
 def textfsm_parse_to_list(input_data, template_name, add_header=False):
     """
     Use TextFSM to parse the input text (from a command output) against the specified TextFSM template.   Use the
     default TextFSM output which is a list, with each entry of the list being a list with the values parsed.  Use
     add_header=True if the header row with value names should be prepended to the start of the list.
 
-    :param input_data:  Path to the input file that TextFSM will parse.
+    :param input_data:  The text that TextFSM will parse.  An open file object can also be passed, in which case the
+                        file is parsed line by line without reading it all into memory.
     :param template_name:  Path to the template file that will be used to parse the above data.
     :param add_header:  When True, will return a header row in the list.  This is useful for directly outputting to CSV.
     :return: The TextFSM output (A list with each entry being a list of values parsed from the input)
     """
 
     logger.debug("Preparing to process with TextFSM and return a list of lists")
-    # Create file object to the TextFSM template and create TextFSM object.
+    # Get the (cached) TextFSM object for the template and clear any state left from a previous parse.
     logger.debug("Using template at: {0}".format(template_name))
-    with open(template_name, 'r') as template:
-        fsm_table = textfsm.TextFSM(template)
+    fsm_table = _compiled_template(template_name)
+    fsm_table.Reset()
 
     # Process our raw data vs the template with TextFSM
     output = fsm_table.ParseText(input_data)
@@ -63,10 +82,10 @@ def textfsm_parse_to_dict(input_data, template_filename):
     """
 
     logger.debug("Preparing to process with TextFSM and return a list of dictionaries.")
-    # Create file object to the TextFSM template and create TextFSM object.
+    # Get the (cached) TextFSM object for the template and clear any state left from a previous parse.
     logger.debug("Using template at: {0}".format(template_filename))
-    with open(template_filename, 'r') as template:
-        fsm_table = textfsm.TextFSM(template)
+    fsm_table = _compiled_template(template_filename)
+    fsm_table.Reset()
 
     # Process our raw data vs the template with TextFSM
     fsm_list = fsm_table.ParseText(input_data)
@@ -130,6 +149,22 @@ def list_of_dicts_to_csv(data, filename, header, add_header=True):
     logger.debug("Completed writing to file {0}".format(filename))
 
 
+def write_commands_to_file(commands, filename):
+    """
+    Writes a list of commands (or any list of lines) into a file, one per line.  The whole file is built in memory and
+    written with a single call, so the file is written in one pass instead of line by line.  Line endings are always
+    '\\n', regardless of operating system.
+
+    :param commands: A list of strings, where each string is a line to be written
+    :type commands: list
+    :param filename: The absolute path to the file to be written
+    :type filename: str
+    """
+    logger.debug("Writing {0} lines to file {1}".format(len(commands), filename))
+    with open(filename, 'w', newline='\n') as output_file:
+        output_file.write("\n".join(commands) + "\n")
+
+
 def extract_system_name(device_id, strip_list=[]):
     """
     In the CDP output some systems return a Hostname(Serial Number) format, while others return Serial(Hostname) output.
@@ -210,9 +245,11 @@ def short_int_name(long_name):
         return long_name
 
 
+@functools.lru_cache(maxsize=4096)
 def long_int_name(short_name):
     """
-    This function expands a short interface name to the full name
+    This function expands a short interface name to the full name.  Results are cached, because the same interface
+    names show up repeatedly across the outputs that a script processes (CDP, show run, port-channel summaries, etc).
 
     :param short_name:  The input string (short interface name)
     :return:  The shortened interface name
@@ -234,6 +271,46 @@ def long_int_name(short_name):
         return short_name
 
 
+# Regular expressions used by extract_desc_pairs() to find interface and description lines in a running config.
+_re_interface = re.compile(r'^interface (\S+)')
+_re_description = re.compile(r'^\s+description (.+)')
+
+
+def extract_desc_pairs(show_run):
+    """
+    Extracts the description of each interface from the output of "show run" in a single pass, without using TextFSM.
+    Interface names are converted to their long version so they can be matched against other outputs.
+
+    :param show_run: The output of "show run".  Either the text itself, or an open file (which is read line by line).
+    :type show_run: str or file
+
+    :return: A dictionary mapping each (long) interface name to its description.  Interfaces without a description
+        are not included.
+    :rtype: dict
+    """
+    if isinstance(show_run, str):
+        show_run = show_run.splitlines()
+
+    descriptions = {}
+    interface = None
+    for line in show_run:
+        if line.startswith("interface "):
+            intf_match = _re_interface.match(line)
+            interface = intf_match.group(1) if intf_match else None
+        elif line[:1] in (" ", "\t"):
+            # Only look for descriptions in the indented lines under an interface.
+            if interface:
+                desc_match = _re_description.match(line)
+                if desc_match:
+                    descriptions[long_int_name(interface)] = desc_match.group(1).rstrip("\r\n")
+        elif line.strip():
+            # Any other un-indented line ends the current interface section.
+            interface = None
+
+    logger.debug("Found descriptions for {0} interfaces".format(len(descriptions)))
+    return descriptions
+
+
 def normalize_protocol(raw_protocol):
     """
     A function to normalize protocol names between IOS and NXOS.  For example, IOS uses 'C' and NXOS uses 'direct" for